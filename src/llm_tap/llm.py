@@ -1,64 +1,269 @@
 # -*- coding: utf-8 -*-
 import os
-import time
+import sys
 import json
 import types
 import typing
 import logging
+import weakref
+import threading
 
 from inspect import isclass
 from enum import Enum, StrEnum
 from textwrap import dedent
+from functools import singledispatch
 from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor
 
 from dataclasses import (
     make_dataclass,
     dataclass,
-    asdict,
     fields,
     is_dataclass,
     MISSING,
 )
 
-import requests
-import llama_cpp
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class_names_mapping = {}
 logger = logging.getLogger(__name__)
 
+primitive_types_mapping = {
+    int: {"type": "integer"},
+    str: {"type": "string"},
+    bool: {"type": "boolean"},
+    float: {"type": "number"},
+    complex: {"type": "string", "format": "complex-number"},
+    bytes: {"type": "string", "contentEncoding": "base64"},
+}
+
+containers = (
+    list,
+    tuple,
+    set,
+    frozenset,
+)
+
+# Per-class caches only hold weak references: classes generated from the
+# places registry are dropped by `models.clear()` and must not be kept alive
+_field_names = weakref.WeakKeyDictionary()
+_class_type_descriptions = weakref.WeakKeyDictionary()
+_class_descriptions = weakref.WeakKeyDictionary()
+_static_schemas = weakref.WeakKeyDictionary()
+_schema_cache = weakref.WeakKeyDictionary()
+_helper_cache = weakref.WeakKeyDictionary()
+_bundle_cache = weakref.WeakKeyDictionary()
+_builder_cache = weakref.WeakKeyDictionary()
+
+_type_descriptions = {}
+_union_descriptions = {}
+
+
+class _WalkState(threading.local):
+    """
+    Schema walks in progress in the current thread.
+    """
+
+    def __init__(self):
+        # Classes registered in `class_names_mapping`, one list per walk.
+        # Cached schemas replay them on hits.
+        self.registering = []
+        # Classes whose static flag is being computed
+        self.checking = set()
+
+
+_walk_state = _WalkState()
+
+
+def clear():
+    class_names_mapping.clear()
+    _field_names.clear()
+    _type_descriptions.clear()
+    _class_type_descriptions.clear()
+    _class_descriptions.clear()
+    _union_descriptions.clear()
+    _static_schemas.clear()
+    _schema_cache.clear()
+    _helper_cache.clear()
+    _bundle_cache.clear()
+    _builder_cache.clear()
 
+
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj):
+    """
+    Encodes `obj` to UTF-8 JSON bytes (with `orjson` when installed).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+# Returned as is by `serialize`. Matched with `type(obj) in` rather than
+# dispatched, so that subclasses (StrEnum, IntEnum...) keep their handlers
+_scalar_types = frozenset((str, int, float, bool, type(None)))
+
+
+@singledispatch
 def serialize(obj):
-    if isinstance(obj, Enum):
-        return obj.value
-    elif isinstance(obj, list):
-        return [serialize(i) for i in obj]
-    elif isinstance(obj, tuple):
-        return [serialize(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: serialize(v) for k, v in obj.items()}
-    elif is_dataclass(obj):
-        return serialize(asdict(obj))
-    else:
+    if type(obj) in _scalar_types:
         return obj
+    if is_dataclass_instance(obj):
+        # Fields are read directly: `asdict` would deep-copy every value
+        # before it is serialized again
+        field_names = _field_names.get(type(obj))
+        if field_names is None:
+            field_names = _field_names[type(obj)] = tuple(
+                f.name for f in fields(obj)
+            )
+        values = ((name, getattr(obj, name)) for name in field_names)
+        return {
+            name: value if type(value) in _scalar_types else serialize(value)
+            for name, value in values
+        }
+    return obj
+
+
+@serialize.register(Enum)
+def _serialize_enum(obj):
+    return obj.value
+
+
+@serialize.register(list)
+@serialize.register(tuple)
+def _serialize_sequence(obj):
+    return [i if type(i) in _scalar_types else serialize(i) for i in obj]
+
+
+@serialize.register(dict)
+def _serialize_dict(obj):
+    return {
+        k: v if type(v) in _scalar_types else serialize(v)
+        for k, v in obj.items()
+    }
+
+
+def serialize_to_json(obj):
+    """
+    Encodes `obj` (dataclass instances included) to UTF-8 JSON bytes.
+    """
+    return json_dumps(serialize(obj))
+
+
+def _describe_type(field_type):
+    origin = getattr(field_type, "__origin__", None)
+
+    if field_type in primitive_types_mapping:
+        return ("primitive",)
+
+    elif is_dataclass(field_type):
+        return ("dataclass",)
+
+    elif origin is typing.Union or isinstance(field_type, types.UnionType):
+        return ("union", field_type.__args__)
+
+    elif isinstance(field_type, types.GenericAlias):
+        return ("container", origin, field_type.__args__)
+
+    elif origin in containers:
+        # typing aliases (typing.List[...], ...) are hydrated but have no
+        # dedicated schema
+        return ("typing_container", origin, field_type.__args__)
+
+    elif isclass(field_type) and issubclass(field_type, Enum):
+        return ("enum",)
+
+    elif type(field_type) is str:
+        return ("name",)
+
+    else:
+        return ("object",)
+
+
+def describe_type(field_type):
+    """
+    Resolves an annotation into a tagged tuple: ("primitive",),
+    ("dataclass",), ("union", args), ("container", origin, args),
+    ("typing_container", origin, args), ("enum",), ("name",) or
+    ("object",). Descriptions are computed once per annotation.
+    """
+    if isinstance(field_type, type):
+        cache, key = _class_type_descriptions, field_type
+    else:
+        # Unions compare equal whatever the order of their members, which
+        # the description keeps: the members are part of the key
+        cache = _type_descriptions
+        key = (
+            type(field_type),
+            field_type,
+            getattr(field_type, "__args__", ()),
+        )
+
+    description = cache.get(key)
+    if description is None:
+        description = cache[key] = _describe_type(field_type)
+
+    return description
+
+
+def describe_union(available_types):
+    """
+    Returns the `Choice<Name>` dataclasses wrapping each member of a union
+    (as exposed in its schema) and a name to class index used to hydrate
+    it. Both are built once per union.
+    """
+    description = _union_descriptions.get(available_types)
+    if description is not None:
+        return description
+
+    augmented_types = tuple(
+        make_dataclass(
+            f"Choice{_cls.__name__}",
+            [
+                (
+                    "name",
+                    StrEnum(f"Enum{_cls.__name__}", [_cls.__name__]),
+                ),
+                ("arguments", _cls),
+            ],
+        )
+        for _cls in available_types
+    )
+
+    classes_by_name = {}
+    for _cls in available_types:
+        classes_by_name.setdefault(_cls.__name__, _cls)
+
+    description = _union_descriptions[available_types] = (
+        augmented_types,
+        classes_by_name,
+    )
+    return description
 
 
 def convert_field(cls, field):
+    schema = _convert_field(cls, field)
+    if _is_cached_class(cls):
+        return _copy_json(schema)
+    return schema
+
+
+def _convert_field(cls, field):
     class_name = cls.__name__
     if getattr(field, "type", None):
         field_type = field.type
     else:
         field_type = field
 
-    mapping = {
-        int: {"type": "integer"},
-        str: {"type": "string"},
-        bool: {"type": "boolean"},
-        float: {"type": "number"},
-        complex: {"type": "string", "format": "complex-number"},
-        bytes: {"type": "string", "contentEncoding": "base64"},
-    }
-
     if field_type is type and callable in field.metadata:
         caller_fn = field.metadata.get(callable)
 
@@ -66,7 +271,7 @@ def convert_field(cls, field):
             raise ValueError("No callable defined.")
 
         field_type = caller_fn()
-        return convert_field(cls, field_type)
+        return _convert_field(cls, field_type)
 
     elif "choices" in getattr(field, "metadata", {}):
         choices = field.metadata["choices"]
@@ -75,81 +280,69 @@ def convert_field(cls, field):
             choices = choices()
 
         return {
-            "oneOf": [to_const_json_schema(c) for c in choices],
+            "oneOf": [_to_const_json_schema(c, cls) for c in choices],
         }
 
-    if field_type in mapping:
-        return mapping[field_type]
-    else:
-        if is_dataclass(field_type):
-            return to_json_schema(field_type)
-
-        elif (
-            hasattr(field_type, "__origin__")
-            and field_type.__origin__ is typing.Union
-        ) or isinstance(field_type, types.UnionType):
-            available_types = field_type.__args__
-            augmented_types = [
-                make_dataclass(
-                    f"Choice{_cls.__name__}",
-                    [
-                        (
-                            "name",
-                            StrEnum(f"Enum{_cls.__name__}", [_cls.__name__]),
-                        ),
-                        ("arguments", _cls),
-                    ],
-                )
-                for _cls in available_types
-            ]
-
-            return {"anyOf": [to_json_schema(t) for t in augmented_types]}
-
-        elif isinstance(field_type, types.GenericAlias):
-            container_type = field_type.__origin__
-            items_type = field_type.__args__
-
-            if len(items_type) != 1:
-                raise NotImplementedError(
-                    f"Annotation not supported for {field_type}[{items_type}]"
-                )
-
-            items_type = items_type[0]
-
-            if is_dataclass(items_type):
-                items = to_json_schema(items_type)
-            else:
-                items = convert_field(cls, items_type)
-
-            container_mapping = {
-                list: {"type": "array", "items": items},
-                tuple: {"type": "array", "items": items},
-                dict: {"type": "object", "additionalProperties": items},
-                set: {"type": "array", "uniqueItems": True, "items": items},
-                frozenset: {
-                    "type": "array",
-                    "uniqueItems": True,
-                    "items": items,
-                },
-            }
-            return container_mapping[container_type]
+    kind, *args = describe_type(field_type)
 
-        elif isclass(field_type) and issubclass(field_type, Enum):
-            return {
-                "type": "string",
-                "enum": list(field_type.__members__.keys()),
-            }
+    if kind == "primitive":
+        return dict(primitive_types_mapping[field_type])
 
-        elif type(field_type) is str:
-            if field_type == class_name:
-                return {"$ref": "#"}
-            else:
-                raise ValueError(f"Unknown field type: {field_type}")
+    elif kind == "dataclass":
+        return _embedded_schema(cls, field_type)
+
+    elif kind == "union":
+        (available_types,) = args
+        augmented_types, _ = describe_union(available_types)
+
+        return {
+            "anyOf": [_embedded_schema(cls, t) for t in augmented_types]
+        }
+
+    elif kind == "container":
+        container_type, items_type = args
+
+        if len(items_type) != 1:
+            raise NotImplementedError(
+                f"Annotation not supported for {field_type}[{items_type}]"
+            )
+
+        items_type = items_type[0]
 
+        if is_dataclass(items_type):
+            items = _embedded_schema(cls, items_type)
         else:
-            return {
-                "type": "object",
-            }
+            items = _convert_field(cls, items_type)
+
+        container_mapping = {
+            list: {"type": "array", "items": items},
+            tuple: {"type": "array", "items": items},
+            dict: {"type": "object", "additionalProperties": items},
+            set: {"type": "array", "uniqueItems": True, "items": items},
+            frozenset: {
+                "type": "array",
+                "uniqueItems": True,
+                "items": items,
+            },
+        }
+        return container_mapping[container_type]
+
+    elif kind == "enum":
+        return {
+            "type": "string",
+            "enum": list(field_type.__members__.keys()),
+        }
+
+    elif kind == "name":
+        if field_type == class_name:
+            return {"$ref": "#"}
+        else:
+            raise ValueError(f"Unknown field type: {field_type}")
+
+    else:
+        return {
+            "type": "object",
+        }
 
 
 def is_dataclass_type(obj):
@@ -160,18 +353,45 @@ def is_dataclass_instance(obj):
     return is_dataclass(obj) and not isinstance(obj, type)
 
 
+def _copy_json(obj):
+    if type(obj) is dict:
+        return {k: _copy_json(v) for k, v in obj.items()}
+    if type(obj) is list:
+        return [_copy_json(v) for v in obj]
+    return obj
+
+
+def _is_cached_class(cls):
+    return is_dataclass_type(cls) and has_static_schema(cls)
+
+
+def _embedded_schema(cls, data_class):
+    """
+    Returns the schema of `data_class` to embed in the schema of `cls`.
+    Cached schemas are shared with the cached schemas embedding them but
+    copied into the others, which are handed out as is.
+    """
+    schema = _to_json_schema(data_class)
+    if has_static_schema(data_class) and not _is_cached_class(cls):
+        return _copy_json(schema)
+    return schema
+
+
 def to_const_json_schema(instance):
     """
     Turns an object into a JSON Schema dict with all attributes as const.
     """
+    return _to_const_json_schema(instance)
+
 
+def _to_const_json_schema(instance, cls=None):
     if is_dataclass_instance(instance):
-        class_names_mapping[instance.__class__.__name__] = instance.__class__
+        _register_class_name(type(instance))
         properties = {"_type": {"const": type(instance).__name__}}
         required = ["_type"]
         for field in fields(instance):
             value = getattr(instance, field.name)
-            properties[field.name] = to_const_json_schema(value)
+            properties[field.name] = _to_const_json_schema(value, cls)
             required.append(field.name)
         return {
             "type": "object",
@@ -179,20 +399,21 @@ def to_const_json_schema(instance):
             "required": required,
         }
     elif is_dataclass_type(instance):
-        return to_json_schema(instance)
+        return _embedded_schema(cls, instance)
     elif isinstance(instance, Enum):
         return {"const": instance.value}
     elif isinstance(instance, list):
         return {
             "type": "array",
-            "items": [to_const_json_schema(v) for v in instance],
+            "items": [_to_const_json_schema(v, cls) for v in instance],
         }
     elif isinstance(instance, dict):
         # frozen dict: all keys/values as const
         return {
             "type": "object",
             "properties": {
-                k: to_const_json_schema(v) for k, v in instance.items()
+                k: _to_const_json_schema(v, cls)
+                for k, v in instance.items()
             },
             "required": list(instance.keys()),
         }
@@ -200,43 +421,176 @@ def to_const_json_schema(instance):
         return {"const": instance}
 
 
-def to_json_schema(data_class):
-    properties = {}
-    required_fields = []
+def is_static_type(field_type):
+    if is_dataclass_type(field_type):
+        return has_static_schema(field_type)
+    return all(is_static_type(t) for t in getattr(field_type, "__args__", ()))
+
+
+def has_static_schema(data_class):
+    """
+    Tells whether the JSON Schema of a dataclass only depends on its
+    annotations. Fields resolving their choices (or their type) through a
+    callable depend on runtime state and are never cached.
+    """
+    static = _static_schemas.get(data_class)
+    if static is not None:
+        return static
+
+    checking = _walk_state.checking
+    if data_class in checking:
+        # Assume self-references are static while the fields are walked
+        return True
+
+    checking.add(data_class)
+    try:
+        static = True
+        for f in fields(data_class):
+            choices = f.metadata.get("choices", ())
+            if callable in f.metadata or callable(choices):
+                static = False
+            elif not is_static_type(f.type):
+                static = False
+            elif not all(is_static_type(c) for c in choices):
+                static = False
+
+            if not static:
+                break
+    finally:
+        checking.discard(data_class)
+
+    # Nested classes found static may rely on an enclosing class assumed
+    # static: only the outermost result is published
+    if not static or not checking:
+        _static_schemas[data_class] = static
+    return static
+
+
+@dataclass(frozen=True)
+class ClassDescription:
+    """
+    Metadata of a dataclass used to build its schema and helper. `fields`
+    holds a (field, type name, required) tuple per field. `doc` is the
+    docstring as shown in the helper (stripped before being dedented).
+    """
+
+    title: str
+    description: str
+    doc: str
+    fields: tuple
 
-    class_names_mapping[data_class.__name__] = data_class
 
+def describe_class(data_class):
+    class_description = _class_descriptions.get(data_class)
+    if class_description is not None:
+        return class_description
+
+    fields_description = []
     for f in fields(data_class):
-        properties[f.name] = convert_field(data_class, f)
+        field_type_name = getattr(
+            f.type, "__name__", getattr(f.type, "_name", "")
+        )
+        required = f.default is MISSING and f.default_factory is MISSING
+        fields_description.append((f, field_type_name, required))
+
+    class_description = _class_descriptions[data_class] = ClassDescription(
+        title=data_class.__name__,
+        # Generated classes share their docstrings: keep a single copy
+        description=sys.intern(dedent(data_class.__doc__).strip()),
+        doc=dedent(data_class.__doc__.strip()),
+        fields=tuple(fields_description),
+    )
+    return class_description
+
+
+def _register_class_name(cls):
+    class_names_mapping[cls.__name__] = cls
+    for registered in _walk_state.registering:
+        registered.append(cls)
+
+
+def to_json_schema(data_class):
+    """
+    Returns the JSON Schema of `data_class`. The result belongs to the
+    caller: cached schemas are embedded in their parents and never handed
+    out.
+    """
+    schema = _to_json_schema(data_class)
+    if has_static_schema(data_class):
+        return _copy_json(schema)
+    return schema
+
+
+def _to_json_schema(data_class):
+    _register_class_name(data_class)
 
-        no_default = f.default == MISSING
-        no_default_factory = f.default_factory == MISSING
-        required = no_default and no_default_factory
+    cached = _schema_cache.get(data_class)
+    if cached is not None:
+        schema, registered = cached
+        # Nested classes are registered again, as a full walk would
+        for cls in registered:
+            _register_class_name(cls)
+        return schema
 
-        if required:
-            required_fields.append(f.name)
+    properties = {}
+    required_fields = []
+
+    class_description = describe_class(data_class)
 
-    data_class_name = data_class.__name__
-    data_class_docstring = dedent(data_class.__doc__).strip()
+    registered = []
+    _walk_state.registering.append(registered)
+    try:
+        for f, _, required in class_description.fields:
+            properties[f.name] = _convert_field(data_class, f)
+
+            if required:
+                required_fields.append(f.name)
+    finally:
+        _walk_state.registering.pop()
 
     schema = {
         "type": "object",
-        "title": data_class_name,
-        "description": data_class_docstring,
+        "title": class_description.title,
+        "description": class_description.description,
         "properties": properties,
         "required": required_fields,
     }
     logger.debug(f"{data_class.__name__} => {schema}")
+
+    if has_static_schema(data_class):
+        _schema_cache[data_class] = (schema, tuple(registered))
+
     return schema
 
 
-def from_dict(cls, attrs):
-    containers = (
-        list,
-        tuple,
-        set,
-        frozenset,
+def compile_builder(data_class):
+    """
+    Returns a function hydrating `data_class` from a dict of attributes.
+    Field types are resolved once, primitive values are passed through and
+    everything else is delegated to `from_dict`. The builder only holds a
+    weak reference to `data_class`.
+    """
+    data_class_ref = weakref.ref(data_class)
+    field_types = {f.name: f.type for f in fields(data_class)}
+    primitive_fields = frozenset(
+        name
+        for name, field_type in field_types.items()
+        if describe_type(field_type)[0] == "primitive"
     )
+
+    def build(attrs):
+        kwargs = {}
+        for name, value in attrs.items():
+            if name in primitive_fields and not isinstance(value, dict):
+                kwargs[name] = value
+            else:
+                kwargs[name] = from_dict(field_types[name], value)
+        return data_class_ref()(**kwargs)
+
+    return build
+
+
+def from_dict(cls, attrs):
     if isinstance(cls, str):
         cls = class_names_mapping.get(cls)
         if cls is None:
@@ -250,41 +604,31 @@ def from_dict(cls, attrs):
         del attrs["_type"]
         return from_dict(concrete_cls, attrs)
 
-    if is_dataclass(cls):
-        field_types = {f.name: f.type for f in fields(cls)}
-        return cls(
-            **{k: from_dict(field_types[k], v) for k, v in attrs.items()}
-        )
+    kind, *args = describe_type(cls)
 
-    elif (
-        isinstance(cls, types.UnionType)
-        or hasattr(cls, "__origin__")
-        and cls.__origin__ is typing.Union
-    ):
-        try:
-            target_cls = next(
-                filter(
-                    lambda target_cls: target_cls.__name__ == attrs["name"],
-                    cls.__args__,
-                )
-            )
-        except StopIteration:
+    if kind == "dataclass":
+        builder = _builder_cache.get(cls)
+        if builder is None:
+            builder = _builder_cache[cls] = compile_builder(cls)
+        return builder(attrs)
+
+    elif kind == "union":
+        (available_types,) = args
+        _, classes_by_name = describe_union(available_types)
+        target_cls = classes_by_name.get(attrs["name"])
+
+        if target_cls is None:
             raise KeyError(f"Class {attrs['name']} not found")
 
         instance = target_cls(**attrs["arguments"])
 
         return instance
 
-    elif hasattr(cls, "__origin__") and cls.__origin__ in containers:
-        return cls.__origin__([from_dict(cls.__args__[0], v) for v in attrs])
+    elif kind in ("container", "typing_container") and args[0] in containers:
+        container_type, items_type = args
+        return container_type([from_dict(items_type[0], v) for v in attrs])
 
-    elif hasattr(cls, "__name__") and cls.__name__ == "list":
-        return [from_dict(cls.__args__[0], v) for v in attrs]
-
-    elif hasattr(cls, "__name__") and cls.__name__ == "set":
-        return set([from_dict(cls.__args__[0], v) for v in attrs])
-
-    elif isclass(cls) and issubclass(cls, Enum):
+    elif kind == "enum":
         return getattr(cls, attrs)
 
     else:
@@ -307,20 +651,20 @@ def as_tool_choice(json_schema):
 
 
 def make_helper(data_class):
-    class_name = f"name: {data_class.__name__}"
-    class_description = f"description: {dedent(data_class.__doc__.strip())}"
+    cached = _helper_cache.get(data_class)
+    if cached is not None:
+        return cached
+
+    description = describe_class(data_class)
+    class_name = f"name: {description.title}"
+    class_description = f"description: {description.doc}"
 
     inputs_schema = []
 
-    for f in fields(data_class):
-        field_name = f.name
-        field_type_name = getattr(
-            f.type, "__name__", getattr(f.type, "_name", "")
-        )
-        is_required = f.default == MISSING and f.default_factory == MISSING
+    for f, field_type_name, is_required in description.fields:
         requirement_status = "(required)" if is_required else ""
         field_representation = (
-            f"{field_name} ({field_type_name}) {requirement_status}"
+            f"{f.name} ({field_type_name}) {requirement_status}"
         )
         inputs_schema.append(field_representation)
 
@@ -329,10 +673,53 @@ def make_helper(data_class):
     helper_description = "\n".join(
         (class_name, class_description, "inputs:", formatted_inputs_schema)
     )
+    _helper_cache[data_class] = helper_description
 
     return helper_description
 
 
+def _build_tool_bundle(data_class):
+    """
+    Shared counterpart of `build_tool_bundle`. The dataclass fields are
+    walked once for both the schema and the helper, and the bundle is
+    cached when the schema is static: its dicts must then be copied before
+    being handed out.
+    """
+    cached = _bundle_cache.get(data_class)
+    if cached is not None:
+        # Hits the schema cache: registers the classes of the schema again
+        _to_json_schema(data_class)
+        return cached
+
+    data_class_schema = _to_json_schema(data_class)
+    bundle = (
+        as_tool(data_class_schema),
+        as_tool_choice(data_class_schema),
+        make_helper(data_class),
+        data_class_schema,
+    )
+
+    if has_static_schema(data_class):
+        _bundle_cache[data_class] = bundle
+
+    return bundle
+
+
+def build_tool_bundle(data_class):
+    """
+    Returns the (tool, tool_choice, helper, schema) tuple sent to the LLM to
+    parse `data_class`. The result belongs to the caller.
+    """
+    bundle = _build_tool_bundle(data_class)
+    if not has_static_schema(data_class):
+        return bundle
+
+    # Cached bundle
+    _, _, helper, schema = bundle
+    schema = _copy_json(schema)
+    return (as_tool(schema), as_tool_choice(schema), helper, schema)
+
+
 def prepare(data_class=None, prompt="", system_prompt="", model=None):
     payload = {
         "messages": [
@@ -349,10 +736,9 @@ def prepare(data_class=None, prompt="", system_prompt="", model=None):
     }
 
     if data_class is not None:
-        data_class_schema = to_json_schema(data_class)
-        data_class_tool = as_tool(data_class_schema)
-        data_class_tool_choice = as_tool_choice(data_class_schema)
-        data_class_helper = make_helper(data_class)
+        data_class_tool, data_class_tool_choice, data_class_helper, _ = (
+            build_tool_bundle(data_class)
+        )
         prompt = "\n\n".join((data_class_helper, prompt))
 
         payload.update(
@@ -377,7 +763,7 @@ def parse_response(attributes, data_class=None):
     if data_class and "tool_calls" in msg:
         tool_call = msg["tool_calls"][0]
         arguments_json = tool_call["function"]["arguments"]
-        arguments_dict = json.loads(arguments_json)
+        arguments_dict = json_loads(arguments_json)
 
         instance = from_dict(data_class, arguments_dict)
         return instance
@@ -394,15 +780,38 @@ class HTTP:
     base_url: str = os.getenv("ENDPOINT")
     api_key: str = os.getenv("API_KEY")
     model: str = os.getenv("DEFAULT_MODEL")
+    max_retries: int = 5
+    backoff_factor: float = 1.0
 
     def __post_init__(self):
+        # Imported here so that schema generation does not pay for them
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
             "api-key": f"{self.api_key}",
         }
+        # Retries (honoring Retry-After) and connection pooling are handled
+        # by urllib3 so that concurrent requests share the same session
+        retries = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 502, 503),
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=retries,
+        )
         self.session = requests.Session()
         self.session.headers.update(headers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def __enter__(self):
         return self
@@ -410,36 +819,55 @@ class HTTP:
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
-    def generate(self, prompt="", system_prompt="You are a helpful assistant"):
-        payload = prepare(None, prompt, system_prompt)
-        response = self.session.post(self.base_url, json=payload)
+    def _post(self, payload):
+        response = self.session.post(self.base_url, data=json_dumps(payload))
 
         try:
             response.raise_for_status()
-        except Exception as e:
-            if response.status_code == 429:
-                time.sleep(10)
-                return self.generate(prompt, system_prompt)
-            print(response.json())
-            raise e
-        attributes = response.json()
+        except Exception:
+            # Error bodies are not necessarily JSON (proxy HTML pages...)
+            logger.error(f"LLM request failed: {response.text}")
+            raise
+
+        return json_loads(response.content)
+
+    def generate(self, prompt="", system_prompt="You are a helpful assistant"):
+        payload = prepare(None, prompt, system_prompt)
+        attributes = self._post(payload)
 
         return parse_response(attributes)
 
     def parse(self, data_class, prompt="", system_prompt="Answer in JSON"):
         payload = prepare(data_class, prompt, system_prompt, self.model)
-        response = self.session.post(self.base_url, json=payload)
-        try:
-            response.raise_for_status()
-        except Exception as e:
-            if response.status_code == 429:
-                time.sleep(10)
-                return self.parse(data_class, prompt)
-            print(response.json())
-            raise e
-        attributes = response.json()
+        attributes = self._post(payload)
         return parse_response(attributes, data_class)
 
+    def parse_many(
+        self,
+        data_class,
+        prompts,
+        system_prompt="Answer in JSON",
+        max_workers=16,
+    ):
+        """
+        Parses several prompts concurrently over the same session.
+        Results are returned in the order of `prompts`.
+        """
+
+        def parse(prompt):
+            return self.parse(data_class, prompt, system_prompt)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(parse, prompts))
+
+
+def _available_cpu_count():
+    # CPUs this process may run on (affinity mask, cpuset), not all of the
+    # machine's logical CPUs
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 2
+    return os.cpu_count() or 2
+
 
 @dataclass
 class LLamaCPP:
@@ -448,9 +876,11 @@ class LLamaCPP:
     reranker_model: str = ""
     n_ctx: int = 4_000
     n_gpu_layers: int = 100
-    n_threads: int = 2
+    n_threads: int = _available_cpu_count()
 
     def __enter__(self):
+        import llama_cpp
+
         path = self.model or self.embedding_model or self.reranker_model
         path = os.path.expanduser(path)
         embedding = (
@@ -4,75 +4,211 @@
 Defines the abstract models to describe Colored Petri Nets
 """
 
-import uuid
+import sys
 import keyword
-from dataclasses import dataclass, make_dataclass, field
+import itertools
+from dataclasses import dataclass, make_dataclass, field, MISSING
 
 
 SOURCE = "source"
 SINK = "sink"
 
-_place_id_registry = {}
+_KEY_SEPARATOR = "\x00"
+
+_KEYWORDS = frozenset(keyword.kwlist)
+
+# Maps every non alphanumeric ASCII character to an underscore
+_IDENTIFIER_TABLE = str.maketrans(
+    {chr(c): "_" for c in range(128) if not chr(c).isalnum()}
+)
+
+
+@dataclass(slots=True)
+class _PlaceRecord:
+    place: "Place" = None
+    token_type: "TokenType" = None
+    place_id: str = None
+
+
+# Ids are never reused within a process, even after clear()
+_place_ids = itertools.count()
+# Place, token type and id of each registered place, keyed by _place_key()
+_registry = {}
 _place_id_to_place = {}
-_place_registry = {}
-_token_type_registry = {}
+# Registered places by place type (source / sink), keyed by _place_key()
+_places_by_type = {}
+# Registered places by token type name, keyed by _place_key()
+_places_by_token_name = {}
+
+# Results derived from the registry (places, their labels and token names)
+# keyed by kind and filters, reset whenever the registry changes
+_places_cache = {}
+_places_cache_size = 256
+
+# Dataclasses generated from token types and places, keyed by what they are
+# built from
+_built_types = {}
 
 
 def make_valid_identifier(s):
     # Replace invalid characters with underscores
-    valid_identifier = "".join(char if char.isalnum() else "_" for char in s)
+    valid_identifier = s.translate(_IDENTIFIER_TABLE)
+
+    if not valid_identifier.isascii():
+        valid_identifier = "".join(
+            char if char.isalnum() else "_" for char in valid_identifier
+        )
 
     # Ensure the identifier doesn't start with a digit
     if valid_identifier[0].isdigit():
         valid_identifier = "_" + valid_identifier
 
     # Check if the identifier is a Python keyword
-    if keyword.iskeyword(valid_identifier):
+    if valid_identifier in _KEYWORDS:
         valid_identifier = valid_identifier + "_"
 
     return valid_identifier
 
 
+def _intern(name):
+    # sys.intern only accepts exact str: str subclasses (StrEnum members...)
+    # are kept as is
+    if type(name) is str:
+        return sys.intern(name)
+    return name
+
+
+def _place_key(place):
+    # A single interned string hashes once and compares by identity
+    return sys.intern(f"{place.name}{_KEY_SEPARATOR}{place.token_type.name}")
+
+
+def _build_once(key, build):
+    try:
+        cls = _built_types.get(key, MISSING)
+    except TypeError:
+        # Unhashable range values
+        return build()
+
+    if cls is MISSING:
+        cls = _built_types[key] = build()
+
+    return cls
+
+
 def clear():
-    _place_registry.clear()
-    _token_type_registry.clear()
-    _place_id_registry.clear()
+    _registry.clear()
     _place_id_to_place.clear()
+    _places_by_type.clear()
+    _places_by_token_name.clear()
+    _places_cache.clear()
+    _built_types.clear()
+
+
+def _get_record(place):
+    key = _place_key(place)
+    record = _registry.get(key)
+    if record is None:
+        record = _registry[key] = _PlaceRecord()
+    return record
 
 
 def register_token_type(place, token_type):
-    key = (place.name, place.token_type.name)
-    _token_type_registry[key] = token_type
+    _get_record(place).token_type = token_type
+    _places_cache.clear()
 
 
 def get_token_names():
-    return tuple(t[1] for t in _token_type_registry.keys())
+    def build():
+        return tuple(
+            key.partition(_KEY_SEPARATOR)[2]
+            for key, record in _registry.items()
+            if record.token_type is not None
+        )
+
+    return _cached(("token_names", ()), build)
 
 
 def register_place(place):
-    key = (place.name, place.token_type.name)
+    key = _place_key(place)
+    record = _get_record(place)
 
-    if key not in _place_id_registry:
-        _place_id_registry[key] = uuid.uuid4().hex[:4]
-        _place_id_to_place[f"id:{_place_id_registry[key]}"] = place
+    if record.place_id is None:
+        record.place_id = format(next(_place_ids), "04x")
+        _place_id_to_place[f"id:{record.place_id}"] = place
 
-    register_token_type(place, place.token_type)
+    if record.place is not None and record.place.type != place.type:
+        del _places_by_type[record.place.type][key]
+    _places_by_type.setdefault(place.type, {})[key] = place
+    _places_by_token_name.setdefault(place.token_type.name, {})[key] = place
 
-    _place_registry[key] = place
+    record.token_type = place.token_type
+    record.place = place
+    _places_cache.clear()
 
 
 def get_place_id(place):
-    key = (place.name, place.token_type.name)
-    return _place_id_registry.get(key, "unregistered")
+    record = _registry.get(_place_key(place))
+    if record is None or record.place_id is None:
+        return "unregistered"
+    return record.place_id
+
+
+def _cached(key, build):
+    try:
+        value = _places_cache.get(key)
+    except TypeError:
+        # Unhashable filters (callables defining __eq__ only)
+        return build()
+
+    if value is not None:
+        return value
+
+    value = build()
+
+    # Filters built on the fly (lambdas) never hit the cache: bound it
+    if len(_places_cache) >= _places_cache_size:
+        _places_cache.clear()
+    _places_cache[key] = value
+
+    return value
 
 
 def get_places(*filters):
-    places = tuple(_place_registry.values())
-    if not filters:
-        return places
-    filtered_places = filter(lambda p: all(f(p) for f in filters), places)
-    filtered_places = list(filtered_places)
-    return set(filtered_places)
+    def build():
+        if len(filters) == 1:
+            # Matched by identity: filters are not necessarily hashable
+            for type_filter, place_type in _place_type_filters:
+                if filters[0] is type_filter:
+                    return get_places_by_type(place_type)
+
+        places = (
+            record.place
+            for record in _registry.values()
+            if record.place is not None
+        )
+        if not filters:
+            return tuple(places)
+        if len(filters) == 1:
+            (f,) = filters
+            return tuple(p for p in places if f(p))
+        return tuple(p for p in places if all(f(p) for f in filters))
+
+    return _cached(("places", filters), build)
+
+
+def get_places_by_type(place_type):
+    def build():
+        return tuple(_places_by_type.get(place_type, {}).values())
+
+    return _cached(("by_type", place_type), build)
+
+
+def get_places_by_token(token_name):
+    def build():
+        return tuple(_places_by_token_name.get(token_name, {}).values())
+
+    return _cached(("by_token", token_name), build)
 
 
 def is_source(place):
@@ -83,24 +219,37 @@ def is_sink(place):
     return place.type == SINK
 
 
+# Filters answered from _places_by_type instead of scanning the registry
+_place_type_filters = (
+    (is_source, SOURCE),
+    (is_sink, SINK),
+)
+
+
 def places_str(*filters):
-    return list(map(str, get_places(*filters)))
+    def build():
+        return tuple(map(str, get_places(*filters)))
+
+    return list(_cached(("str", filters), build))
 
 
 def places_with_ids(*filters):
-    return [
-        f"id:{get_place_id(place)} {place}" for place in get_places(*filters)
-    ]
+    def build():
+        return tuple(
+            f"id:{get_place_id(place)} {place}"
+            for place in get_places(*filters)
+        )
 
+    return list(_cached(("with_ids", filters), build))
 
-def places_ids(*filters):
-    return [f"id:{get_place_id(place)}" for place in get_places(*filters)]
 
+def places_ids(*filters):
+    def build():
+        return tuple(
+            f"id:{get_place_id(place)}" for place in get_places(*filters)
+        )
 
-def tokens_for_places(*filters):
-    places = get_places(*filters)
-    for p in places:
-        pass
+    return list(_cached(("ids", filters), build))
 
 
 supported_types = (
@@ -137,31 +286,34 @@ supported_operands = (
 )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ITokenValue:
     value: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IPlaceState:
     place: str
     operator: str = field(metadata={"choices": supported_operands})
     value: ITokenValue
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IPlaceChangeState:
     set_value: str
     to: ITokenValue
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TokenType:
     name: str
     type: str = field(metadata={"choices": token_types})
     range: list = field(default_factory=list)
     sub_type: type = None
 
+    def __post_init__(self):
+        object.__setattr__(self, "name", _intern(self.name))
+
     def build_discrete_type(self):
         available_values = tuple(self.range)
         field_name = "value"
@@ -173,6 +325,7 @@ class TokenType:
             [
                 (field_name, field_type, field_default),
             ],
+            slots=True,
         )
         return cls
 
@@ -185,6 +338,7 @@ class TokenType:
             [
                 (field_name, field_type),
             ],
+            slots=True,
         )
         return cls
 
@@ -203,12 +357,18 @@ class TokenType:
             [
                 (field_name, field_type),
             ],
+            slots=True,
         )
         if doc_string:
             cls.__doc__ = doc_string
         return cls
 
-    def build_value_type(self):
+    def cache_key(self):
+        # 0, False and 0.0 are equal: range values are keyed with their type
+        range_key = tuple((type(v), v) for v in self.range or ())
+        return (self.name, self.type, range_key, self.sub_type)
+
+    def _build_value_type(self):
         if self.type == "DISCRETE":
             return self.build_discrete_type()
 
@@ -218,27 +378,43 @@ class TokenType:
         if self.type == "NUMERIC":
             return self.build_numeric_type()
 
+    def build_value_type(self):
+        key = ("value", *self.cache_key())
+        return _build_once(key, self._build_value_type)
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Place:
     name: str
     description: str
     type: str = field(metadata={"choices": place_types})
     token_type: TokenType
 
+    def __post_init__(self):
+        object.__setattr__(self, "name", _intern(self.name))
+
     def details(self):
-        return "\n".join(
-            (
-                f"id:{get_place_id(self)}",
-                str(self),
-                self.description,
+        def build():
+            return "\n".join(
+                (
+                    f"id:{get_place_id(self)}",
+                    str(self),
+                    self.description,
+                )
             )
-        )
+
+        # Everything the details are made of (the id depends on the key)
+        key = ("details", _place_key(self), self.type, self.description)
+        return _cached(key, build)
 
     def __str__(self):
         return f"{self.type}: {self.name} [{self.token_type.name}]"
 
     def build_place_state_type(self):
+        key = ("place_state", self.name, *self.token_type.cache_key())
+        return _build_once(key, self._build_place_state_type)
+
+    def _build_place_state_type(self):
         PlaceState = make_dataclass(
             "PlaceState",
             [
@@ -260,10 +436,15 @@ class Place:
                 ),
                 ("value", self.token_type.build_value_type()),
             ],
+            slots=True,
         )
         return PlaceState
 
     def build_change_state_type(self):
+        key = ("change_state", self.name, *self.token_type.cache_key())
+        return _build_once(key, self._build_change_state_type)
+
+    def _build_change_state_type(self):
         PlaceChangeState = make_dataclass(
             "PlaceChangeState",
             [
@@ -280,16 +461,17 @@ class Place:
                 ),
                 ("to", self.token_type.build_value_type()),
             ],
+            slots=True,
         )
         return PlaceChangeState
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class InputArc:
     place: str = field(metadata={"choices": lambda: places_str(is_source)})
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OutputArc:
     place: str = field(metadata={"choices": lambda: places_str(is_sink)})
     token_produced: IPlaceChangeState = field(
@@ -301,7 +483,7 @@ class OutputArc:
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Condition:
     """
     Condition are written < place > < operator > < value >
@@ -316,20 +498,20 @@ class Condition:
     )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Guard:
     conditions: list[Condition]
     conditions_operator: str = field(metadata={"choices": conditions_op})
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Transition:
     inputs: list[InputArc]
     guard: Guard
     output: OutputArc
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Workflow:
     transition: Transition
 
@@ -338,25 +520,23 @@ class Workflow:
         guard = transition.guard
         output = transition.output
 
-        s = []
-
-        s.append("Workflow Details:")
-        s.append("Transition:")
-        s.append("  Guard:")
-        s.append(f"    Conditions: {guard.conditions_operator}")
-
-        for c in guard.conditions:
-            s.append(
-                f"      - {c.place_state.place} "
-                f"{c.place_state.operator} {c.place_state.value}"
-            )
+        conditions = (
+            f"      - {c.place_state.place} "
+            f"{c.place_state.operator} {c.place_state.value}"
+            for c in guard.conditions
+        )
 
-        s.append("  Output:")
-        s.append(
+        return "\n".join(
             (
-                f"    Set {output.token_produced.set_value}"
-                f" to {output.token_produced.to.value}"
+                "Workflow Details:",
+                "Transition:",
+                "  Guard:",
+                f"    Conditions: {guard.conditions_operator}",
+                *conditions,
+                "  Output:",
+                (
+                    f"    Set {output.token_produced.set_value}"
+                    f" to {output.token_produced.to.value}"
+                ),
             )
         )
-
-        return "\n".join(s)